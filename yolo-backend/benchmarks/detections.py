@@ -0,0 +1,51 @@
+import timeit
+import torch
+from detections import build_class_lookup, serialize_detections
+from types import SimpleNamespace
+from ultralytics.engine.results import Boxes
+
+NAMES = {class_id: f"class-{class_id}" for class_id in range(80)}
+ORIG_SHAPE = (640, 640)
+REPEATS = 200
+
+def make_results(count: int) -> list:
+    xy = torch.rand(count, 2) * 600
+    xyxy = torch.cat([xy, xy + torch.rand(count, 2) * 40], dim=1)
+    conf = torch.rand(count)
+    cls = torch.randint(0, len(NAMES), (count,)).float()
+    boxes = Boxes(torch.cat([xyxy, conf[:, None], cls[:, None]], dim=1), ORIG_SHAPE)
+    return [SimpleNamespace(boxes=boxes)]
+
+def serialize_per_box(results, names: dict[int, str]) -> list[dict]:
+    detections = []
+    for result in results:
+        for box in result.boxes:
+            x1, y1, x2, y2 = box.xyxy[0].tolist()
+            confidence = float(box.conf[0])
+            class_id = int(box.cls[0])
+            class_name = names[class_id]
+            detections.append({
+                "object": class_name,
+                "confidence": confidence,
+                "boundingBox": [x1, y1, x2, y2]
+            })
+    return detections
+
+def main():
+    class_lookup = build_class_lookup(NAMES)
+
+    print(f"{'boxes':>6} {'per-box (ms)':>14} {'vectorized (ms)':>16} {'speedup':>8}")
+    for count in (10, 100, 1000):
+        results = make_results(count)
+        assert serialize_per_box(results, NAMES) == serialize_detections(results, class_lookup)
+
+        per_box = min(timeit.repeat(lambda: serialize_per_box(results, NAMES), number=REPEATS, repeat=3))
+        vectorized = min(timeit.repeat(lambda: serialize_detections(results, class_lookup), number=REPEATS, repeat=3))
+
+        print(
+            f"{count:>6} {per_box / REPEATS * 1000:>14.3f} "
+            f"{vectorized / REPEATS * 1000:>16.3f} {per_box / vectorized:>7.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
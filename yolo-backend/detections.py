@@ -0,0 +1,30 @@
+import numpy as np
+
+def build_class_lookup(names: dict[int, str]) -> np.ndarray:
+    lookup = np.empty(max(names) + 1 if names else 0, dtype=object)
+    for class_id, class_name in names.items():
+        lookup[class_id] = class_name
+    return lookup
+
+def serialize_detections(results, class_lookup: np.ndarray) -> list[dict]:
+    boxes = [result.boxes for result in results if result.boxes is not None and len(result.boxes)]
+
+    if not boxes:
+        return []
+
+    xyxy = np.concatenate([box.xyxy.cpu().numpy() for box in boxes])
+    confidences = np.concatenate([box.conf.cpu().numpy() for box in boxes])
+    class_ids = np.concatenate([box.cls.cpu().numpy() for box in boxes]).astype(np.intp)
+
+    return [
+        {
+            "object": class_name,
+            "confidence": confidence,
+            "boundingBox": bounding_box
+        }
+        for class_name, confidence, bounding_box in zip(
+            class_lookup[class_ids].tolist(),
+            confidences.tolist(),
+            xyxy.tolist()
+        )
+    ]
@@ -1,3 +1,5 @@
+from .admission import AdmissionController
 from .auth import verify_access_token
+from .rate_limit import rate_limit
 
-__all__ = ["verify_access_token"]
+__all__ = ["AdmissionController", "rate_limit", "verify_access_token"]
@@ -0,0 +1,111 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
+
+class AdmissionController:
+    def __init__(self, slots: int, target_wait: float, smoothing: float = 0.2):
+        self.slots = slots
+        self.target_wait = target_wait
+        self.smoothing = smoothing
+        self.free_slots = slots
+        self.queued = 0
+        self.service_estimate = target_wait
+        self.waiters: OrderedDict[str, deque[tuple[asyncio.Future, float]]] = OrderedDict()
+
+    def expected_wait(self, now: float) -> float:
+        oldest_wait = now - min((queue[0][1] for queue in self.waiters.values()), default=now)
+        return max(oldest_wait, (self.queued + 1) * self.service_estimate / self.slots)
+
+    def record_service(self, duration: float):
+        self.service_estimate += self.smoothing * (duration - self.service_estimate)
+
+    def enqueue(self, user_id: str, queued_at: float) -> asyncio.Future:
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(user_id, deque()).append((waiter, queued_at))
+        self.queued += 1
+        return waiter
+
+    def dequeue(self, user_id: str, waiter: asyncio.Future):
+        queue = self.waiters.get(user_id)
+        if not queue:
+            return
+
+        for entry in queue:
+            if entry[0] is waiter:
+                queue.remove(entry)
+                self.queued -= 1
+                break
+
+        if not queue:
+            del self.waiters[user_id]
+
+    def release(self, started_at: float | None = None):
+        if started_at is not None:
+            self.record_service(time.monotonic() - started_at)
+
+        while self.waiters:
+            user_id, queue = self.waiters.popitem(last=False)
+            waiter, _ = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self.waiters[user_id] = queue
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+        self.free_slots += 1
+
+    async def acquire(self, user_id: str) -> float:
+        if self.free_slots > 0 and not self.waiters:
+            self.free_slots -= 1
+            return time.monotonic()
+
+        now = time.monotonic()
+        expected_wait = self.expected_wait(now)
+        if expected_wait > self.target_wait:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is overloaded, please retry later",
+                headers={"Retry-After": str(max(1, math.ceil(expected_wait)))},
+            )
+
+        waiter = self.enqueue(user_id, now)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self.dequeue(user_id, waiter)
+            raise
+
+        return time.monotonic()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str):
+        started_at = await self.acquire(user_id)
+
+        try:
+            yield
+        finally:
+            self.release(started_at)
+
+    async def run_in_thread(self, user_id: str, func, *args, **kwargs):
+        started_at = await self.acquire(user_id)
+
+        try:
+            task = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+        except BaseException:
+            self.release(started_at)
+            raise
+
+        def finish(task: asyncio.Future):
+            if not task.cancelled():
+                task.exception()
+            self.release(started_at)
+
+        task.add_done_callback(finish)
+        return await asyncio.shield(task)
@@ -0,0 +1,137 @@
+import math
+import os
+import time
+from database import prisma
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException, status
+from .auth import verify_access_token
+
+load_dotenv()
+
+PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+}
+
+MAX_MEMORY_BUCKETS = 10000
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.refilled_at = time.monotonic()
+
+    def refill(self, now: float):
+        elapsed = now - self.refilled_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.refilled_at = now
+
+    def take(self) -> float:
+        self.refill(time.monotonic())
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.refill_rate
+
+buckets: dict[str, TokenBucket] = {}
+
+def parse_rate(rate: str) -> tuple[float, float]:
+    count, _, period = rate.partition("/")
+    seconds = PERIODS.get(period.strip().lower())
+
+    if not seconds or not count.strip().isdigit() or int(count) <= 0:
+        raise ValueError(f"Invalid rate limit '{rate}', expected '<count>/<second|minute|hour>'")
+
+    capacity = float(count)
+    return capacity, capacity / seconds
+
+def prune_memory_buckets():
+    now = time.monotonic()
+    for key in list(buckets):
+        bucket = buckets[key]
+        bucket.refill(now)
+        if bucket.tokens >= bucket.capacity:
+            del buckets[key]
+
+async def take_memory_token(key: str, capacity: float, refill_rate: float) -> float:
+    bucket = buckets.get(key)
+
+    if not bucket:
+        if len(buckets) >= MAX_MEMORY_BUCKETS:
+            prune_memory_buckets()
+        bucket = buckets[key] = TokenBucket(capacity, refill_rate)
+
+    return bucket.take()
+
+async def take_postgres_token(key: str, capacity: float, refill_rate: float) -> float:
+    rows = await prisma.query_raw(
+        """
+        INSERT INTO "rate_limit_buckets" ("key", "tokens", "refilled_at")
+        VALUES ($1, $2::double precision - 1, EXTRACT(EPOCH FROM now())::double precision)
+        ON CONFLICT ("key") DO UPDATE SET
+            "tokens" = LEAST(
+                $2::double precision,
+                "rate_limit_buckets"."tokens"
+                    + (EXTRACT(EPOCH FROM now())::double precision - "rate_limit_buckets"."refilled_at")
+                    * $3::double precision
+            ) - 1,
+            "refilled_at" = EXTRACT(EPOCH FROM now())::double precision
+        WHERE LEAST(
+            $2::double precision,
+            "rate_limit_buckets"."tokens"
+                + (EXTRACT(EPOCH FROM now())::double precision - "rate_limit_buckets"."refilled_at")
+                * $3::double precision
+        ) >= 1
+        RETURNING "tokens"
+        """,
+        key,
+        capacity,
+        refill_rate,
+    )
+
+    if rows:
+        return 0.0
+
+    rows = await prisma.query_raw(
+        """
+        SELECT LEAST(
+            $2::double precision,
+            "tokens" + (EXTRACT(EPOCH FROM now())::double precision - "refilled_at") * $3::double precision
+        ) AS "tokens"
+        FROM "rate_limit_buckets"
+        WHERE "key" = $1
+        """,
+        key,
+        capacity,
+        refill_rate,
+    )
+
+    tokens = float(rows[0]["tokens"]) if rows else 0.0
+    return max(0.0, (1 - tokens) / refill_rate)
+
+def rate_limit(route: str, rate: str):
+    capacity, refill_rate = parse_rate(rate)
+
+    async def enforce_rate_limit(user: dict = Depends(verify_access_token)) -> dict:
+        backend = os.getenv("RATE_LIMIT_BACKEND", "memory")
+        key = f"{user['id']}:{route}"
+
+        if backend == "postgres":
+            retry_after = await take_postgres_token(key, capacity, refill_rate)
+        else:
+            retry_after = await take_memory_token(key, capacity, refill_rate)
+
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+        return user
+
+    return enforce_rate_limit
@@ -0,0 +1,189 @@
+import io
+import json
+import math
+import os
+import re
+from dotenv import load_dotenv
+from PIL import Image
+
+load_dotenv()
+
+IMAGE_MAX_EDGE = int(os.getenv("GEMINI_IMAGE_MAX_EDGE", "1024"))
+IMAGE_JPEG_QUALITY = int(os.getenv("GEMINI_IMAGE_JPEG_QUALITY", "85"))
+IMAGE_MODE = os.getenv("GEMINI_IMAGE_MODE", "full")
+MAX_CROPS = int(os.getenv("GEMINI_MAX_CROPS", "4"))
+CROP_PADDING = float(os.getenv("GEMINI_CROP_PADDING", "0.1"))
+MIN_CONFIDENCE = float(os.getenv("GEMINI_MIN_CONFIDENCE", "0.25"))
+DUPLICATE_IOU = float(os.getenv("GEMINI_DUPLICATE_IOU", "0.9"))
+
+IMAGE_MODES = ("full", "crops")
+
+if IMAGE_MODE not in IMAGE_MODES:
+    raise ValueError(f"Invalid GEMINI_IMAGE_MODE '{IMAGE_MODE}', expected one of {', '.join(IMAGE_MODES)}")
+
+IRREGULAR_PLURALS = {
+    "person": "people",
+    "mouse": "mice",
+    "knife": "knives",
+}
+
+SYSTEM_INSTRUCTION = """You are an assistant that answers questions about YOLO object detections.
+
+Each request contains the image size, a detections table and a user question. The table has one row per detection in the form:
+id|object|confidence|x1,y1,x2,y2
+- "object": the class name of the detected object
+- "confidence": the confidence score (0-1)
+- "x1,y1,x2,y2": bounding box in pixel coordinates of the image size given, where (x1, y1) is the top-left corner and (x2, y2) is the bottom-right corner
+
+The images attached are either the full image, or crops around the detections listed under "Crops" in the order given.
+
+Answer concisely based on both the detection data and the images provided."""
+
+REQUEST_TEMPLATE = """Image size: {width}x{height}
+Detections:
+{table}
+{crops}
+Question:
+{question}"""
+
+def encode_jpeg(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+def image_scale(image: Image.Image) -> float:
+    return min(1.0, IMAGE_MAX_EDGE / max(image.size))
+
+def downscale_image(image: Image.Image) -> Image.Image:
+    scale = image_scale(image)
+
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.Resampling.LANCZOS)
+
+    return image
+
+def intersection_over_union(a: list[float], b: list[float]) -> float:
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+
+    if width <= 0 or height <= 0:
+        return 0.0
+
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+def parse_detection(detection: dict) -> dict:
+    x1, y1, x2, y2 = (float(value) for value in detection["boundingBox"])
+    confidence = float(detection["confidence"])
+
+    if not all(map(math.isfinite, (x1, y1, x2, y2, confidence))):
+        raise ValueError("Detection values must be finite numbers")
+
+    return {
+        "object": str(detection["object"]),
+        "confidence": confidence,
+        "boundingBox": [min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)]
+    }
+
+def prune_detections(detections: list[dict]) -> list[dict]:
+    candidates = sorted(
+        (
+            detection
+            for detection in map(parse_detection, detections)
+            if detection["confidence"] >= MIN_CONFIDENCE
+        ),
+        key=lambda detection: detection["confidence"],
+        reverse=True
+    )
+
+    kept = []
+    for candidate in candidates:
+        if not any(
+            detection["object"] == candidate["object"]
+            and intersection_over_union(detection["boundingBox"], candidate["boundingBox"]) >= DUPLICATE_IOU
+            for detection in kept
+        ):
+            kept.append(candidate)
+
+    return kept
+
+def format_table(detections: list[dict], scale: float) -> str:
+    if not detections:
+        return "(none)"
+
+    return "\n".join(
+        f"{index}|{detection['object']}|{round(detection['confidence'], 2):g}|"
+        f"{','.join(str(round(value * scale)) for value in detection['boundingBox'])}"
+        for index, detection in enumerate(detections)
+    )
+
+def word_forms(word: str) -> set[str]:
+    forms = {word, f"{word}s", f"{word}es"}
+
+    if word.endswith("y"):
+        forms.add(f"{word[:-1]}ies")
+    if word in IRREGULAR_PLURALS:
+        forms.add(IRREGULAR_PLURALS[word])
+
+    return forms
+
+def mentions(words: list[str], class_name: str) -> bool:
+    *head, last = class_name.lower().split()
+    forms = word_forms(last)
+    return any(
+        words[index:index + len(head)] == head and words[index + len(head)] in forms
+        for index in range(len(words) - len(head))
+    )
+
+def select_crop_detections(detections: list[dict], question: str) -> list[int]:
+    words = re.findall(r"[a-z0-9]+", question.lower())
+    mentioned = [index for index, detection in enumerate(detections) if mentions(words, detection["object"])]
+    return (mentioned or list(range(len(detections))))[:MAX_CROPS]
+
+def crop_detection(image: Image.Image, bounding_box: list[float]) -> Image.Image:
+    x1, y1, x2, y2 = bounding_box
+    pad_x = (x2 - x1) * CROP_PADDING
+    pad_y = (y2 - y1) * CROP_PADDING
+
+    left = min(max(0, math.floor(x1 - pad_x)), image.width - 1)
+    top = min(max(0, math.floor(y1 - pad_y)), image.height - 1)
+    right = max(left + 1, min(image.width, math.ceil(x2 + pad_x)))
+    bottom = max(top + 1, min(image.height, math.ceil(y2 + pad_y)))
+
+    return downscale_image(image.crop((left, top, right, bottom)))
+
+def build_payload(image_bytes: bytes, detections: str, question: str) -> tuple[list, dict]:
+    original = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    scale = image_scale(original)
+    kept = prune_detections(json.loads(detections))
+
+    crop_indices = select_crop_detections(kept, question) if IMAGE_MODE == "crops" and kept else []
+    if crop_indices:
+        images = [encode_jpeg(crop_detection(original, kept[index]["boundingBox"])) for index in crop_indices]
+        crops = f"Crops: {','.join(map(str, crop_indices))}\n"
+    else:
+        images = [encode_jpeg(downscale_image(original))]
+        crops = ""
+
+    prompt = REQUEST_TEMPLATE.format(
+        width=max(1, round(original.width * scale)),
+        height=max(1, round(original.height * scale)),
+        table=format_table(kept, scale),
+        crops=crops,
+        question=question
+    )
+
+    contents = [{"mime_type": "image/jpeg", "data": data} for data in images]
+    contents.append(prompt)
+
+    usage = {
+        "originalBytes": len(image_bytes) + len(detections.encode("utf-8")) + len(question.encode("utf-8")),
+        "imageBytes": sum(len(data) for data in images),
+        "promptBytes": len(prompt.encode("utf-8")),
+        "detections": len(kept)
+    }
+    usage["sentBytes"] = usage["imageBytes"] + usage["promptBytes"]
+
+    return contents, usage
@@ -1,24 +1,34 @@
+import asyncio
 import google.generativeai as genai
-import io
-import json
+import logging
 import os
 from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, File, Form, HTTPException, status, UploadFile
-from middlewares import verify_access_token
-from PIL import Image
+from middlewares import AdmissionController, rate_limit, verify_access_token
+from payload import SYSTEM_INSTRUCTION, build_payload
 
 load_dotenv()
 
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-model = genai.GenerativeModel("gemini-2.5-flash")
+model = genai.GenerativeModel("gemini-2.5-flash", system_instruction=SYSTEM_INSTRUCTION)
+
+logger = logging.getLogger("uvicorn.error")
+
+admission = AdmissionController(
+    slots=int(os.getenv("GEMINI_REQUEST_SLOTS", "8")),
+    target_wait=float(os.getenv("GEMINI_TARGET_QUEUE_WAIT", "10")),
+)
 
 router = APIRouter(
     prefix="/gemini",
     tags=["Gemini"]
 )
 
-@router.post("/ask")
+@router.post(
+    "/ask",
+    dependencies=[Depends(rate_limit("gemini-ask", os.getenv("GEMINI_ASK_RATE_LIMIT", "10/minute")))]
+)
 async def ask_question(
     file: UploadFile = File(...),
     detections: str = Form(...),
@@ -27,32 +37,29 @@ async def ask_question(
 ):
     try:
         image_bytes = await file.read()
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
         
-        prompt = f"""
-You are an assistant that answers questions about YOLO object detections.
-
-Detections (JSON string):
-```json
-{detections}
-```
-
-Each detection contains:
-- "object": the class name of the detected object
-- "confidence": the confidence score (0-1)
-- "boundingBox": [x1, y1, x2, y2] - bounding box coordinates where (x1, y1) is the top-left corner and (x2, y2) is the bottom-right corner in pixel coordinates
+        try:
+            contents, usage = await asyncio.to_thread(build_payload, image_bytes, detections, question)
+        except (LookupError, TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid detections payload"
+            )
 
-User question:
-{question}
+        async with admission.slot(user["id"]):
+            response = await model.generate_content_async(contents)
 
-Answer concisely based on both the detection data and the image provided.
-"""
+        if response.usage_metadata:
+            usage["promptTokens"] = response.usage_metadata.prompt_token_count
+            usage["responseTokens"] = response.usage_metadata.candidates_token_count
+            usage["cachedTokens"] = response.usage_metadata.cached_content_token_count
 
-        response = model.generate_content([image, prompt])
+        logger.info("Gemini payload usage: %s", usage)
 
         return {
             "content": response.text,
-            "role": "assistant"
+            "role": "assistant",
+            "usage": usage
         }
 
     except HTTPException:
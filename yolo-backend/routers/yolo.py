@@ -1,18 +1,48 @@
 import base64
 import io
+import os
+import queue
+from detections import build_class_lookup, serialize_detections
+from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, File, HTTPException, status, UploadFile
-from middlewares import verify_access_token
+from middlewares import AdmissionController, rate_limit, verify_access_token
 from PIL import Image
 from ultralytics import YOLO
 
-model = YOLO("models/yolov8n.pt")
+load_dotenv()
+
+inference_slots = int(os.getenv("YOLO_INFERENCE_SLOTS", "1"))
+
+if inference_slots < 1:
+    raise ValueError(f"Invalid YOLO_INFERENCE_SLOTS '{inference_slots}', expected a positive integer")
+
+models: queue.Queue[YOLO] = queue.Queue()
+for _ in range(inference_slots):
+    models.put(YOLO("models/yolov8n.pt"))
+
+class_lookup = build_class_lookup(models.queue[0].names)
+
+admission = AdmissionController(
+    slots=inference_slots,
+    target_wait=float(os.getenv("YOLO_TARGET_QUEUE_WAIT", "5")),
+)
+
+def predict(image: Image.Image) -> list:
+    model = models.get()
+    try:
+        return model.predict(source=image, save=False)
+    finally:
+        models.put(model)
 
 router = APIRouter(
     prefix="/yolo",
     tags=["Yolo"]
 )
 
-@router.post("/detect")
+@router.post(
+    "/detect",
+    dependencies=[Depends(rate_limit("yolo-detect", os.getenv("YOLO_DETECT_RATE_LIMIT", "30/minute")))]
+)
 async def detect_objects(
     file: UploadFile = File(...),
     user: dict = Depends(verify_access_token)
@@ -21,20 +51,9 @@ async def detect_objects(
         image_bytes = await file.read()
         image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
         
-        results = model.predict(source=image, save=False)
+        results = await admission.run_in_thread(user["id"], predict, image)
         
-        detections = []
-        for result in results:
-            for box in result.boxes:
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                confidence = float(box.conf[0])
-                class_id = int(box.cls[0])
-                class_name = model.names[class_id]
-                detections.append({
-                    "object": class_name,
-                    "confidence": confidence,
-                    "boundingBox": [x1, y1, x2, y2]
-                })
+        detections = serialize_detections(results, class_lookup)
         
         annotated_image = Image.fromarray(results[0].plot())
         buffer = io.BytesIO()